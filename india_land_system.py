@@ -3,6 +3,8 @@ import webbrowser
 import json
 import os
 import heapq
+import bisect
+import numpy as np
 from random import uniform, choice
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
@@ -36,6 +38,8 @@ class IndiaLandProcurementSystem:
         }
         
         self.default_city = "Delhi"
+        self.nearest_city_count = 3  # Number of nearest city centres stored per parcel
+        self.city_index_chunk_size = 4096  # Parcels per vectorized distance batch
         self.geolocator = Nominatim(user_agent="india_land_system_v4", timeout=10)
         
         # Enhanced classification system
@@ -70,6 +74,8 @@ class IndiaLandProcurementSystem:
         
         if not self.land_data:
             self.initialize_sample_data()
+        
+        self.rebuild_city_index()
     
     def load_data(self):
         """Load land data from file"""
@@ -102,6 +108,106 @@ class IndiaLandProcurementSystem:
         c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
         return R * c
     
+    def haversine_to_cities(self, lats, lons):
+        """Distances in km from each point to every city centre, shape (points, cities)"""
+        lat1 = np.radians(np.asarray(lats, dtype=float))[:, None]
+        lon1 = np.radians(np.asarray(lons, dtype=float))[:, None]
+        lat2 = self._city_lats[None, :]
+        lon2 = self._city_lons[None, :]
+        
+        R = 6371  # Earth radius in km
+        a = (np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+        return R * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    
+    def nearest_cities(self, coords):
+        """Find the k nearest city centres for each coordinate as [(city, distance_km), ...]"""
+        k = min(self.nearest_city_count, len(self._city_names))
+        if k == 0:
+            return [[] for _ in coords]
+        if not coords:
+            return []
+        points = np.asarray(coords, dtype=float)
+        size = self.city_index_chunk_size
+        results = []
+        # Work in chunks so the distance matrix stays small for large datasets
+        for start in range(0, len(points), size):
+            chunk = points[start:start + size]
+            distances = self.haversine_to_cities(chunk[:, 0], chunk[:, 1])
+            nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            nearest_dist = np.take_along_axis(distances, nearest, axis=1)
+            order = np.argsort(nearest_dist, axis=1)
+            nearest = np.take_along_axis(nearest, order, axis=1)
+            nearest_dist = np.take_along_axis(nearest_dist, order, axis=1)
+            for row_idx, row_dist in zip(nearest, nearest_dist):
+                results.append([(self._city_names[i], float(d)) for i, d in zip(row_idx, row_dist)])
+        return results
+    
+    def rebuild_city_index(self):
+        """Assign every parcel to its nearest city centres (call after changing city_coordinates)"""
+        self._city_names = list(self.city_coordinates.keys())
+        city_coords = np.array(list(self.city_coordinates.values()), dtype=float).reshape(-1, 2)
+        self._city_lats = np.radians(city_coords[:, 0])
+        self._city_lons = np.radians(city_coords[:, 1])
+        
+        # Distance from each city to its k-th nearest other city. A parcel within
+        # radius r of a city can only be missing from that city's index entries if
+        # k other centres lie within 2r of it, so this tells when a lookup is complete.
+        k = self.nearest_city_count
+        self._city_kth_neighbour_km = {}
+        if len(self._city_names) > k:
+            between = self.haversine_to_cities(city_coords[:, 0], city_coords[:, 1])
+            np.fill_diagonal(between, np.inf)
+            kth = np.partition(between, k - 1, axis=1)[:, k - 1]
+            self._city_kth_neighbour_km = {city: float(d) for city, d in zip(self._city_names, kth)}
+        
+        # city_assignment: parcel coord -> [(city, distance_km), ...] nearest first
+        # city_index: city -> [(distance_km, parcel coord), ...] sorted by distance
+        self.city_assignment = {}
+        self.city_index = {city: [] for city in self._city_names}
+        coords = list(self.land_data.keys())
+        for coord, nearest in zip(coords, self.nearest_cities(coords)):
+            self.city_assignment[coord] = nearest
+            for city, distance in nearest:
+                self.city_index[city].append((distance, coord))
+        for entries in self.city_index.values():
+            entries.sort()
+    
+    def index_parcel(self, coord):
+        """Add a parcel to the city index, replacing any existing entries for the same coordinate"""
+        for city, distance in self.city_assignment.get(coord, []):
+            entries = self.city_index.get(city, [])
+            i = bisect.bisect_left(entries, (distance, coord))
+            if i < len(entries) and entries[i] == (distance, coord):
+                del entries[i]
+        nearest = self.nearest_cities([coord])[0]
+        self.city_assignment[coord] = nearest
+        for city, distance in nearest:
+            bisect.insort(self.city_index[city], (distance, coord))
+    
+    def get_city_properties(self, city_name, radius_km=None, nearest_only=False):
+        """Look up parcels for a city as (distance, coord, data), closest first.
+        
+        With radius_km, every parcel within that distance of the city centre is
+        returned; if nearby cities are too dense for the index to guarantee that,
+        this falls back to a full radius scan. With nearest_only, only parcels
+        whose nearest centre is this city are returned.
+        """
+        if city_name not in self.city_index:
+            return []
+        if (radius_km is not None and not nearest_only
+                and self._city_kth_neighbour_km.get(city_name, float('inf')) <= 2 * radius_km):
+            return sorted(self.get_properties_in_radius(self.city_coordinates[city_name], radius_km),
+                          key=lambda p: p[0])
+        
+        properties = []
+        for distance, coord in self.city_index[city_name]:
+            if radius_km is not None and distance > radius_km:
+                break
+            if nearest_only and self.city_assignment[coord][0][0] != city_name:
+                continue
+            properties.append((distance, coord, self.land_data[coord]))
+        return properties
+    
     def get_properties_in_radius(self, center_coord, radius_km):
         """Find properties within given radius using haversine distance"""
         properties = []
@@ -111,14 +217,13 @@ class IndiaLandProcurementSystem:
                 properties.append((distance, coord, data))
         return properties
     
-    def analyze_city_prices(self, city_name):
+    def analyze_city_prices(self, city_name, radius_km=30):
         """Analyze and compare land prices in a city"""
         if city_name not in self.city_coordinates:
             print(f"City {city_name} not found in database")
             return None
         
-        city_center = self.city_coordinates[city_name]
-        city_properties = self.get_properties_in_radius(city_center, 30)  # 30km radius
+        city_properties = self.get_city_properties(city_name, radius_km)
         
         if not city_properties:
             print(f"No properties found for {city_name}")
@@ -228,6 +333,7 @@ class IndiaLandProcurementSystem:
         }
         
         self.land_data[(lat, lon)] = new_data
+        self.index_parcel((lat, lon))
         self.save_data()
         return new_data
     
@@ -340,10 +446,10 @@ class IndiaLandProcurementSystem:
             ).add_to(analysis_group)
         
         # Add heatmap of prices
-        price_data = []
-        for coord, data in self.land_data.items():
-            if data['city'].lower() == analysis['city'].lower():
-                price_data.append([*coord, data['price']])
+        price_data = [
+            [*coord, data['price']]
+            for _, coord, data in self.get_city_properties(analysis['city'], nearest_only=True)
+        ]
         
         if price_data:
             from folium.plugins import HeatMap